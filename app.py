@@ -1,12 +1,15 @@
 import streamlit as st
 import requests
-import tempfile
 import os
 import base64
 import json
+import re
+import hashlib
+import time
+import threading
+from collections import OrderedDict
 from datetime import datetime
 import io
-import google.generativeai as genai
 
 # Page configuration
 st.set_page_config(
@@ -36,48 +39,185 @@ def setup_sidebar():
         
         st.subheader("🎨 Advanced")
         creativity = st.slider("Creativity", 0.1, 1.0, 0.7)
+        model_name = st.selectbox(
+            "Gemini model",
+            ["gemini-2.5-flash", "gemini-2.5-flash-lite", "gemini-2.5-pro"],
+            help="Flash models answer faster and cost less; Pro is slower but more detailed"
+        )
         
         return api_key, {
             "style": video_style,
-            "creativity": creativity
+            "creativity": creativity,
+            "model": model_name
         }
 
 def transcribe_audio_simulation(audio_file):
     """Simulate audio transcription - in production, use actual speech-to-text"""
     return "A person narrating a story about creating amazing content with artificial intelligence."
 
+def audio_digest(audio_file):
+    """Hash the uploaded audio's contents without copying its bytes"""
+    return hashlib.blake2b(audio_file.getbuffer(), digest_size=16).hexdigest()
+
+@st.cache_data(ttl=3600, max_entries=128, show_spinner=False)
+def _cached_transcription(audio_hash, _audio_file):
+    """Transcribe once per distinct audio content"""
+    return transcribe_audio_simulation(_audio_file)
+
+def transcribe_audio(audio_file):
+    """Transcribe uploaded audio, reusing the result if the same file was seen before"""
+    return _cached_transcription(audio_digest(audio_file), audio_file)
+
+# Fixed storyboard instructions, sent as the model's system instruction so the
+# per-request prompt only carries the inputs that actually change
+CONCEPT_INSTRUCTIONS = """
+Create a detailed video concept based on the audio transcription and user description you are given.
+
+Please provide:
+1. A compelling video title
+2. Detailed scene-by-scene description
+3. Visual style guidance
+4. Color palette suggestions
+5. Recommended camera angles and movements
+
+Make it creative and engaging!
+"""
+
+# Per-request inputs, filled in after the fixed instructions above
+CONCEPT_PROMPT_TEMPLATE = """
+AUDIO TRANSCRIPTION: {transcription}
+
+USER DESCRIPTION: {user_prompt}
+
+STYLE: {style}
+"""
+
+# genai.configure sets process-wide state shared by every session
+_GEMINI_CONFIG_LOCK = threading.Lock()
+
+@st.cache_resource
+def get_gemini_model(api_key, model_name):
+    """Configure Gemini once per API key and model, and reuse the model client across reruns"""
+    # Imported here so the SDK's heavy dependencies don't slow down first paint
+    import google.generativeai as genai
+    from google.generativeai import client as genai_client
+    
+    with _GEMINI_CONFIG_LOCK:
+        genai.configure(api_key=api_key)
+        model = genai.GenerativeModel(
+            model_name,
+            system_instruction=CONCEPT_INSTRUCTIONS
+        )
+        # The model otherwise picks up the default client lazily on its first call,
+        # by which time another session may have configured a different key
+        model._client = genai_client.get_default_generative_client()
+    return model
+
+# Generated concepts are kept for an hour, up to this many distinct requests
+CONCEPT_CACHE_TTL = 3600
+CONCEPT_CACHE_MAX_ENTRIES = 128
+
+# Sessions run on separate threads, so every access to the shared cache takes this lock
+_CONCEPT_CACHE_LOCK = threading.Lock()
+
+@st.cache_resource
+def _concept_cache():
+    """Concepts shared across sessions, keyed by a digest of the request inputs"""
+    return OrderedDict()
+
+def _cached_concept(key):
+    """Return a stored concept if it is still fresh, dropping it once expired"""
+    cache = _concept_cache()
+    with _CONCEPT_CACHE_LOCK:
+        entry = cache.get(key)
+        if entry is None:
+            return None
+        if time.monotonic() - entry[0] >= CONCEPT_CACHE_TTL:
+            del cache[key]
+            return None
+        # Keep eviction least-recently-used, as with st.cache_data
+        cache.move_to_end(key)
+        return entry[1]
+
+def _store_concept(key, concept_text):
+    """Store a concept, evicting the oldest entries past the size limit"""
+    # An empty concept is a failure; caching it would block retries until it expires
+    if not concept_text:
+        return
+    cache = _concept_cache()
+    with _CONCEPT_CACHE_LOCK:
+        cache[key] = (time.monotonic(), concept_text)
+        cache.move_to_end(key)
+        while len(cache) > CONCEPT_CACHE_MAX_ENTRIES:
+            cache.popitem(last=False)
+
 def generate_video_concept(transcription, user_prompt, settings, api_key):
-    """Generate video concept using Gemini"""
+    """Generate video concept using Gemini, streaming the text as it arrives"""
     try:
-        genai.configure(api_key=api_key)
-        model = genai.GenerativeModel('gemini-2.5-flash')
+        # The API key is part of the digest, so it is never stored in the clear
+        cache_key = hashlib.sha256(json.dumps(
+            [transcription, user_prompt, settings['style'], settings['creativity'], settings['model'], api_key]
+        ).encode()).hexdigest()
         
-        prompt = f"""
-        Create a detailed video concept based on this audio transcription and user description.
+        concept = _cached_concept(cache_key)
+        if concept:
+            return concept
         
-        AUDIO TRANSCRIPTION: {transcription}
+        model = get_gemini_model(api_key, settings['model'])
         
-        USER DESCRIPTION: {user_prompt}
+        prompt = CONCEPT_PROMPT_TEMPLATE.format(
+            transcription=transcription,
+            user_prompt=user_prompt,
+            style=settings['style']
+        )
         
-        STYLE: {settings['style']}
+        # Show tokens as they arrive instead of blocking on the full response
+        placeholder = st.empty()
+        concept = ""
+        try:
+            for chunk in model.generate_content(prompt, stream=True):
+                # The last chunk may carry only a finish reason or usage metadata,
+                # and chunk.text raises on chunks without parts
+                if not chunk.candidates or not chunk.candidates[0].content.parts:
+                    continue
+                concept += "".join(part.text for part in chunk.candidates[0].content.parts)
+                placeholder.markdown(concept)
+        finally:
+            # Clear the streamed text even if the stream stops partway
+            placeholder.empty()
         
-        Please provide:
-        1. A compelling video title
-        2. Detailed scene-by-scene description
-        3. Visual style guidance
-        4. Color palette suggestions
-        5. Recommended camera angles and movements
+        if not concept:
+            raise ValueError("Gemini returned no text for this request")
         
-        Make it creative and engaging!
-        """
-        
-        response = model.generate_content(prompt)
-        return response.text
+        _store_concept(cache_key, concept)
+        return concept
         
     except Exception as e:
         st.error(f"Gemini API error: {str(e)}")
         return None
 
+# Lines containing any of these keywords are rendered as section headers
+SECTION_HEADER_RE = re.compile(r'title:|scene|palette|angles', re.IGNORECASE)
+
+# Static visual elements, built once at import instead of on every render
+COLOR_PALETTE_HTML = (
+    "<div style='display: flex; gap: 5px; margin: 10px 0;'>"
+    + "".join(
+        f"<div style='width: 30px; height: 30px; background-color: {color}; border-radius: 4px;'></div>"
+        for color in ["#FF6B6B", "#4ECDC4", "#45B7D1"]
+    )
+    + "</div>"
+)
+
+STYLE_TAGS_HTML = (
+    "<div style='display: flex; flex-wrap: wrap; gap: 5px; margin: 10px 0;'>"
+    + "".join(
+        f"<span style='background: #4ECDC4; color: white; padding: 4px 8px; border-radius: 12px; font-size: 12px;'>{tag}</span>"
+        for tag in ["Cinematic", "Dynamic", "Emotional", "Professional"]
+    )
+    + "</div>"
+)
+
 def create_concept_display(concept_text):
     """Create a beautiful display for the video concept"""
     st.subheader("🎬 Generated Video Concept")
@@ -91,13 +231,15 @@ def create_concept_display(concept_text):
         with col1:
             # Display the main concept
             st.markdown("### 📋 Video Plan")
-            concept_display = ""
+            concept_display = []
             for line in lines:
                 if line.strip():
-                    if any(keyword in line.lower() for keyword in ['title:', 'scene', 'palette', 'angles']):
-                        st.markdown(f"**{line}**")
+                    if SECTION_HEADER_RE.search(line):
+                        concept_display.append(f"**{line}**")
                     else:
-                        st.markdown(line)
+                        concept_display.append(line)
+            # One markdown element instead of one per line
+            st.markdown("\n\n".join(concept_display))
             
         with col2:
             # Create a visual representation
@@ -105,21 +247,11 @@ def create_concept_display(concept_text):
             
             # Color palette simulation
             st.markdown("**Color Palette:**")
-            colors = ["#FF6B6B", "#4ECDC4", "#45B7D1", "#96CEB4", "#FFEAA7"]
-            color_html = "<div style='display: flex; gap: 5px; margin: 10px 0;'>"
-            for color in colors[:3]:
-                color_html += f"<div style='width: 30px; height: 30px; background-color: {color}; border-radius: 4px;'></div>"
-            color_html += "</div>"
-            st.markdown(color_html, unsafe_allow_html=True)
+            st.markdown(COLOR_PALETTE_HTML, unsafe_allow_html=True)
             
             # Style indicators
             st.markdown("**Style Tags:**")
-            tags = ["Cinematic", "Dynamic", "Emotional", "Professional"]
-            tags_html = "<div style='display: flex; flex-wrap: wrap; gap: 5px; margin: 10px 0;'>"
-            for tag in tags:
-                tags_html += f"<span style='background: #4ECDC4; color: white; padding: 4px 8px; border-radius: 12px; font-size: 12px;'>{tag}</span>"
-            tags_html += "</div>"
-            st.markdown(tags_html, unsafe_allow_html=True)
+            st.markdown(STYLE_TAGS_HTML, unsafe_allow_html=True)
 
 def main():
     # Setup sidebar
@@ -140,7 +272,7 @@ def main():
             st.audio(audio_file, format=audio_file.type)
             
             # Audio info
-            file_size = len(audio_file.getvalue()) / 1024  # KB
+            file_size = audio_file.size / 1024  # KB
             st.info(f"File size: {file_size:.1f} KB")
         
         st.subheader("📝 Video Description")
@@ -148,7 +280,8 @@ def main():
             "Describe your video:",
             placeholder="Describe the scenes, mood, characters, and style you want...",
             height=120,
-            help="This will be combined with your audio transcription"
+            help="This will be combined with your audio transcription",
+            key="video_prompt"
         )
 
     with col2:
@@ -159,11 +292,21 @@ def main():
                 st.error("🔑 Please enter your Google AI Studio API key")
                 return
                 
-            if st.button("🚀 Generate Video Concept", use_container_width=True):
+            # Identifies the inputs a stored concept was generated from. The upload's
+            # file_id stands in for its contents so reruns never hash the audio
+            concept_sig = (
+                audio_file.file_id,
+                video_prompt,
+                json.dumps(settings, sort_keys=True)
+            )
+            
+            # Unchanged inputs already have their concept shown below, so skip the pipeline
+            generate = st.button("🚀 Generate Video Concept", use_container_width=True)
+            if generate and st.session_state.get('last_sig') != concept_sig:
                 with st.spinner("Creating your video concept..."):
                     try:
-                        # Step 1: Simulate audio transcription
-                        transcription = transcribe_audio_simulation(audio_file)
+                        # Step 1: Transcribe audio
+                        transcription = transcribe_audio(audio_file)
                         
                         # Step 2: Generate video concept
                         concept = generate_video_concept(
@@ -174,22 +317,31 @@ def main():
                         )
                         
                         if concept:
-                            st.success("✅ Video concept generated successfully!")
-                            create_concept_display(concept)
-                            
-                            # Download concept as text file
-                            st.download_button(
-                                "📥 Download Concept",
-                                concept,
-                                file_name=f"video_concept_{datetime.now().strftime('%Y%m%d_%H%M%S')}.txt",
-                                mime="text/plain",
-                                use_container_width=True
+                            st.session_state['last_concept'] = concept
+                            st.session_state['last_sig'] = concept_sig
+                            st.session_state['last_filename'] = (
+                                f"video_concept_{datetime.now().strftime('%Y%m%d_%H%M%S')}.txt"
                             )
+                            st.success("✅ Video concept generated successfully!")
                         else:
                             st.error("❌ Failed to generate concept. Please try again.")
                             
                     except Exception as e:
                         st.error(f"❌ Error: {str(e)}")
+            
+            # Keep showing the last concept when other widgets trigger a rerun
+            if st.session_state.get('last_sig') == concept_sig:
+                concept = st.session_state['last_concept']
+                create_concept_display(concept)
+                
+                # Download concept as text file
+                st.download_button(
+                    "📥 Download Concept",
+                    concept,
+                    file_name=st.session_state['last_filename'],
+                    mime="text/plain",
+                    use_container_width=True
+                )
         
         elif not audio_file:
             # Show instructions
@@ -209,23 +361,30 @@ def main():
             """)
 
 # Add examples section
+EXAMPLE_PROMPTS = {
+    "🌅 Scenic Landscape": "A beautiful sunset over mountains, cinematic style, warm colors, peaceful atmosphere",
+    "🚀 Tech Innovation": "Futuristic technology, holographic interfaces, blue and purple colors, modern and clean",
+    "🎭 Storytelling": "Character journey through magical forest, fantasy style, vibrant colors, emotional"
+}
+
+def use_example_prompt(prompt):
+    """Fill the video description with an example prompt before the rerun"""
+    st.session_state.video_prompt = prompt
+
 def add_examples():
     st.markdown("---")
     st.subheader("🎨 Example Prompts")
     
     examples = st.columns(3)
     
-    example_prompts = {
-        "🌅 Scenic Landscape": "A beautiful sunset over mountains, cinematic style, warm colors, peaceful atmosphere",
-        "🚀 Tech Innovation": "Futuristic technology, holographic interfaces, blue and purple colors, modern and clean",
-        "🎭 Storytelling": "Character journey through magical forest, fantasy style, vibrant colors, emotional"
-    }
-    
-    for col, (title, prompt) in zip(examples, example_prompts.items()):
+    for col, (title, prompt) in zip(examples, EXAMPLE_PROMPTS.items()):
         with col:
-            if st.button(title, use_container_width=True):
-                st.session_state.video_prompt = prompt
-                st.rerun()
+            st.button(
+                title,
+                use_container_width=True,
+                on_click=use_example_prompt,
+                args=(prompt,)
+            )
 
 if __name__ == "__main__":
     main()